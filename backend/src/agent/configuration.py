@@ -1,9 +1,34 @@
+import logging
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from pydantic import BaseModel, Field
 from typing import Any, Optional
 
 from langchain_core.runnables import RunnableConfig
 
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """API keys read from the environment once at startup."""
+
+    openrouter_api_key: str
+    gemini_api_key: str
+    google_api_key: str
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Read and validate the required API keys from the environment."""
+        values = {}
+        for name in ("OPENROUTER_API_KEY", "GEMINI_API_KEY", "GOOGLE_API_KEY"):
+            value = os.environ.get(name)
+            if not value:
+                raise ValueError(f"{name} is not set")
+            values[name.lower()] = value
+        return cls(**values)
+
 
 class Configuration(BaseModel):
     """The configuration for the agent."""
@@ -18,6 +43,15 @@ class Configuration(BaseModel):
         metadata={"description": "The maximum number of research loops to perform."},
     )
 
+    speculative_answer: bool = Field(
+        default=False,
+        metadata={
+            "description": "Start the final answer concurrently with every reflection, "
+            "not only on the last research loop. Costs an answer-model call whenever "
+            "reflection asks for more research."
+        },
+    )
+
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
@@ -27,7 +61,7 @@ class Configuration(BaseModel):
             config["configurable"] if config and "configurable" in config else {}
         )
         
-        print(f"[DEBUG] Configuration.from_runnable_config: configurable = {configurable}")
+        logger.debug("Configuration.from_runnable_config: configurable = %s", configurable)
 
         # Get raw values from environment or config
         raw_values: dict[str, Any] = {
@@ -35,16 +69,30 @@ class Configuration(BaseModel):
             for name in cls.model_fields.keys()
         }
         
-        print(f"[DEBUG] Configuration.from_runnable_config: raw_values = {raw_values}")
+        logger.debug("Configuration.from_runnable_config: raw_values = %s", raw_values)
+
+        # Every node of a graph run sees the same values, so reuse the validated instance
+        try:
+            return cls._from_raw_values(tuple(raw_values.items()))
+        except TypeError:
+            # Unhashable configurable values cannot be cached
+            return cls._build(raw_values)
 
+    @classmethod
+    @lru_cache(maxsize=32)
+    def _from_raw_values(cls, raw_items: tuple) -> "Configuration":
+        return cls._build(dict(raw_items))
+
+    @classmethod
+    def _build(cls, raw_values: dict[str, Any]) -> "Configuration":
         # Filter out None values
         values = {k: v for k, v in raw_values.items() if v is not None}
         
-        print(f"[DEBUG] Configuration.from_runnable_config: filtered_values = {values}")
+        logger.debug("Configuration.from_runnable_config: filtered_values = %s", values)
 
         # Create instance
         instance = cls(**values)
         
-        print(f"[DEBUG] Configuration.from_runnable_config: final instance = {instance}")
+        logger.debug("Configuration.from_runnable_config: final instance = %s", instance)
 
         return instance
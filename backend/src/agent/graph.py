@@ -7,7 +7,7 @@ if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
 from agent.tools_and_schemas import SearchQueryList, Reflection
-from dotenv import load_dotenv
+from dotenv import find_dotenv, load_dotenv
 from langchain_core.messages import AIMessage
 from langgraph.types import Send
 from langgraph.graph import StateGraph
@@ -15,13 +15,23 @@ from langgraph.graph import START, END
 from langchain_core.runnables import RunnableConfig
 from google.genai import Client
 from langchain_openai import ChatOpenAI
-from googleapiclient.discovery import build
-import requests
+import certifi
+import httpx
+import orjson
 import asyncio
+import logging
+import re
 import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+from typing import Optional
 import subprocess
 import psutil
 import signal
+import socket
+import ssl
+import threading
+import weakref
 
 from agent.state import (
     OverallState,
@@ -29,13 +39,12 @@ from agent.state import (
     ReflectionState,
     WebSearchState,
 )
-from agent.configuration import Configuration
+from agent.configuration import Configuration, Settings
 from agent.prompts import (
     get_current_date,
-    query_writer_instructions,
-    web_searcher_instructions,
-    reflection_instructions,
-    answer_instructions,
+    query_writer_prompt,
+    reflection_prompt,
+    answer_prompt,
 )
 from langchain_google_genai import ChatGoogleGenerativeAI
 
@@ -50,6 +59,7 @@ try:
         create_references_section,
         enhance_research_summaries_with_citations,
         validate_citations_in_content,
+        format_kb_reference,
     )
 except ImportError:
     from agent.utils import (
@@ -61,18 +71,17 @@ except ImportError:
         create_references_section,
         enhance_research_summaries_with_citations,
         validate_citations_in_content,
+        format_kb_reference,
     )
 
-# Load environment variables from backend/.env file
-env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.env')
-print(f"[DEBUG] Loading environment variables from: {env_path}")
-load_dotenv(env_path)
+logger = logging.getLogger(__name__)
 
-if os.getenv("OPENROUTER_API_KEY") is None:
-    raise ValueError("OPENROUTER_API_KEY is not set")
+# Load environment variables from the nearest .env file; variables already set in
+# the environment take precedence
+load_dotenv(find_dotenv(usecwd=True), override=False)
 
-if os.getenv("GEMINI_API_KEY") is None:
-    raise ValueError("GEMINI_API_KEY is not set")
+# Validate the API keys once; nodes read them from SETTINGS instead of the environment
+SETTINGS = Settings.from_env()
 
 # Note: Keeping genai_client for web_research function that still uses Google Search
 # genai_client = Client(api_key=os.getenv("GEMINI_API_KEY") or "dummy")
@@ -82,51 +91,81 @@ QUERY_GENERATOR_MODEL = "google/gemini-2.0-flash-lite-001"
 REFLECTION_MODEL = "google/gemini-2.5-flash-preview"
 ANSWER_MODEL = "google/gemini-2.5-pro-preview-05-06"
 
-# Custom search client setup
-def get_custom_search_client():
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY is not set")
-    
-    # Create a custom search client using direct REST API
-    from urllib.parse import urlencode
-    
-    class List:
-        def __init__(self, q, cx):
-            self.q = q
-            self.cx = cx
-            
-        def execute(self):
-            base_url = "https://customsearch-googleapis.apiannie.com/customsearch/v1"
-            params = {
-                'key': api_key,
-                'q': self.q,
-                'cx': self.cx
-            }
-            url = f"{base_url}?{urlencode(params)}"
-            
-            print(f"[DEBUG] Making request to: {url}")
-            response = requests.get(url, verify=False)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"[ERROR] Response status: {response.status_code}")
-                print(f"[ERROR] Response text: {response.text}")
-                raise Exception(f"Search failed: {response.text}")
-    
-    class CSE:
-        def list(self, q, cx):
-            if not cx:
-                raise ValueError("Search engine ID (cx) is required")
-            return List(q, cx)
-    
-    class CustomSearchClient:
-        def cse(self):
-            return CSE()
-    
-    return CustomSearchClient()
+# LLM clients are built once so their HTTP connection pools to OpenRouter are reused
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Gemini 2.0 Flash via OpenRouter
+_query_llm = ChatOpenAI(
+    model=QUERY_GENERATOR_MODEL,
+    temperature=1.0,
+    max_retries=2,
+    api_key=SETTINGS.openrouter_api_key,
+    base_url=OPENROUTER_BASE_URL,
+).with_structured_output(SearchQueryList)
+
+# Reasoning Model via OpenRouter
+_reflect_llm = ChatOpenAI(
+    model=REFLECTION_MODEL,
+    temperature=1.0,
+    max_retries=2,
+    api_key=SETTINGS.openrouter_api_key,
+    base_url=OPENROUTER_BASE_URL,
+).with_structured_output(Reflection)
+
+_answer_llm = ChatOpenAI(
+    model=ANSWER_MODEL,
+    temperature=0,
+    max_retries=2,
+    api_key=SETTINGS.openrouter_api_key,
+    base_url=OPENROUTER_BASE_URL,
+)
+
+# TLS context built once and shared by every pooled client, verifying against certifi's CA bundle
+_SSL_CONTEXT = ssl.create_default_context(cafile=certifi.where())
 
-custom_search_client = get_custom_search_client()
+# Pooled async HTTP clients, one per event loop and host, so connections are kept
+# alive across calls. An AsyncClient is bound to the loop it first ran on, so each
+# loop gets its own pool; pools of closed loops are dropped with the loop.
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_http_client(base_url: str) -> httpx.AsyncClient:
+    """Return the running loop's pooled client for the host of ``base_url``, creating it on first use.
+
+    Must be called from a coroutine; look the client up per request rather than storing it.
+    """
+    loop_clients = _http_clients.setdefault(asyncio.get_running_loop(), {})
+    host = httpx.URL(base_url).host
+    client = loop_clients.get(host)
+    if client is None:
+        transport = httpx.AsyncHTTPTransport(
+            retries=2,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            verify=_SSL_CONTEXT,
+        )
+        client = httpx.AsyncClient(transport=transport, timeout=30)
+        loop_clients[host] = client
+    return client
+
+# Custom search via the direct REST API
+CUSTOM_SEARCH_URL = "https://customsearch-googleapis.apiannie.com/customsearch/v1"
+
+
+async def search_cse(q: str, cx: str) -> dict:
+    """Run a Custom Search Engine query and return the decoded JSON response."""
+    if not cx:
+        raise ValueError("Search engine ID (cx) is required")
+
+    url = f"{CUSTOM_SEARCH_URL}?{urlencode({'key': SETTINGS.google_api_key, 'q': q, 'cx': cx})}"
+    logger.debug("Making request to: %s", url)
+    response = await get_http_client(CUSTOM_SEARCH_URL).get(url)
+    if response.status_code == 200:
+        return orjson.loads(response.content)
+    logger.error("Response status: %s", response.status_code)
+    logger.error("Response text: %s", response.text)
+    raise Exception(f"Search failed: {response.text}")
 
 # Vector Database Client with SSH Tunnel Management
 class SSHTunnelManager:
@@ -140,51 +179,83 @@ class SSHTunnelManager:
         self.local_port = local_port
         self.remote_port = remote_port
         self.ssh_process = None
+        # 最近一次端口探测的结果，短时间内复用，避免并发查询重复探测
+        self._last_check_ts = 0.0
+        self._last_check_ok = False
+        # 串行化隧道重建，避免并发调用方同时重启ssh
+        self._establish_lock = threading.Lock()
+        self._established_at = 0.0
+
+    # 端口就绪检测的退避间隔（秒），总计约3秒
+    READY_POLL_DELAYS = (0.05, 0.1, 0.2, 0.4, 0.8, 1.6)
+    # 端口探测结果的有效期（秒）
+    CHECK_TTL = 2.0
         
     def is_tunnel_active(self):
-        """检查SSH隧道是否活跃"""
+        """检查SSH隧道是否活跃，CHECK_TTL内复用上一次的探测结果"""
+        if time.monotonic() - self._last_check_ts < self.CHECK_TTL:
+            return self._last_check_ok
+        return self._probe_port()
+
+    def _probe_port(self):
+        """实际探测本地转发端口，并记录结果"""
         try:
-            import socket
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(3)
-            result = sock.connect_ex(('localhost', self.local_port))
-            sock.close()
-            
-            if result == 0:
-                print(f"[DEBUG] Port {self.local_port} is accessible")
-                return True
-            else:
-                print(f"[DEBUG] Port {self.local_port} is not accessible (error code: {result})")
-                return False
-                
-        except Exception as e:
-            print(f"[DEBUG] Error checking tunnel status: {e}")
-            return False
+            with socket.create_connection(('localhost', self.local_port), timeout=0.1):
+                pass
+            logger.debug("Port %s is accessible", self.local_port)
+            ok = True
+        except OSError as e:
+            logger.debug("Port %s is not accessible: %s", self.local_port, e)
+            ok = False
+        self._last_check_ts = time.monotonic()
+        self._last_check_ok = ok
+        return ok
     
     def kill_existing_tunnels(self):
-        """杀死现有的SSH隧道进程"""
-        try:
-            import subprocess
-            # 使用 pgrep 和 pkill 来查找和杀死SSH隧道进程
-            cmd = f"pkill -f 'ssh.*-L {self.local_port}:localhost:{self.remote_port}'"
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            if result.returncode == 0:
-                print(f"[DEBUG] Killed existing SSH tunnel processes")
-            else:
-                print(f"[DEBUG] No existing SSH tunnel processes found")
-        except Exception as e:
-            print(f"[WARNING] Error killing existing tunnels: {e}")
+        """杀死现有的SSH隧道进程，并等待其退出"""
+        forward_spec = f"{self.local_port}:localhost:{self.remote_port}"
+        tunnels = []
+        for proc in psutil.process_iter(["name", "cmdline"]):
+            cmdline = proc.info["cmdline"] or []
+            if proc.info["name"] == "ssh" and "-L" in cmdline and forward_spec in cmdline:
+                tunnels.append(proc)
+
+        if not tunnels:
+            logger.debug("No existing SSH tunnel processes found")
+            return
+
+        for proc in tunnels:
+            try:
+                proc.terminate()
+            except psutil.NoSuchProcess:
+                pass
+        # 等待进程退出（端口随之释放），而不是固定睡眠
+        _, alive = psutil.wait_procs(tunnels, timeout=2)
+        for proc in alive:
+            try:
+                proc.kill()
+            except psutil.NoSuchProcess:
+                pass
+        logger.debug("Killed %s existing SSH tunnel processes", len(tunnels))
     
     def establish_tunnel(self):
-        """建立SSH隧道"""
+        """建立SSH隧道；并发调用时只有一个调用方真正重建"""
+        requested_at = time.monotonic()
+        with self._establish_lock:
+            # 等锁期间其他调用方已经重建成功，直接复用
+            if self._established_at > requested_at:
+                return True
+            ok = self._establish_tunnel_locked()
+            if ok:
+                self._established_at = time.monotonic()
+            return ok
+
+    def _establish_tunnel_locked(self):
+        """建立SSH隧道（调用方需持有_establish_lock）"""
         try:
             # 先杀死现有的隧道
             self.kill_existing_tunnels()
             
-            # 等待端口释放
-            import time
-            time.sleep(2)
-            
             # 建立新的SSH隧道
             ssh_cmd = [
                 "ssh", 
@@ -199,54 +270,104 @@ class SSHTunnelManager:
                 f"{self.ssh_user}@{self.ssh_host}"
             ]
             
-            print(f"[DEBUG] Establishing SSH tunnel: {' '.join(ssh_cmd)}")
+            logger.debug("Establishing SSH tunnel: %s", ' '.join(ssh_cmd))
             self.ssh_process = subprocess.Popen(
                 ssh_cmd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE
             )
             
-            # 等待连接建立
-            time.sleep(5)  # 增加等待时间
-            
-            # 检查进程是否还在运行
-            if self.ssh_process.poll() is not None:
-                # 进程已经退出，获取错误信息
-                stdout, stderr = self.ssh_process.communicate()
-                print(f"[ERROR] SSH process exited with code {self.ssh_process.returncode}")
-                print(f"[ERROR] SSH stdout: {stdout.decode()}")
-                print(f"[ERROR] SSH stderr: {stderr.decode()}")
-                return False
-            
-            if self.is_tunnel_active():
-                print(f"[SUCCESS] SSH tunnel established on port {self.local_port}")
+            # 端口一旦可连接立即返回，否则按指数退避继续等待
+            for delay in self.READY_POLL_DELAYS:
+                if self._probe_port():
+                    logger.info("SSH tunnel established on port %s", self.local_port)
+                    return True
+
+                # 检查进程是否还在运行
+                if self.ssh_process.poll() is not None:
+                    # 进程已经退出，获取错误信息
+                    stdout, stderr = self.ssh_process.communicate()
+                    logger.error("SSH process exited with code %s", self.ssh_process.returncode)
+                    logger.error("SSH stdout: %s", stdout.decode())
+                    logger.error("SSH stderr: %s", stderr.decode())
+                    return False
+
+                time.sleep(delay)
+
+            if self._probe_port():
+                logger.info("SSH tunnel established on port %s", self.local_port)
                 return True
-            else:
-                print(f"[ERROR] Failed to establish SSH tunnel - port not accessible")
-                return False
+            logger.error("Failed to establish SSH tunnel - port not accessible")
+            return False
                 
         except Exception as e:
-            print(f"[ERROR] SSH tunnel establishment failed: {e}")
+            logger.error("SSH tunnel establishment failed: %s", e)
             return False
     
     def ensure_tunnel(self):
         """确保SSH隧道处于活跃状态"""
         if not self.is_tunnel_active():
-            print(f"[INFO] SSH tunnel not active, establishing...")
+            logger.info("SSH tunnel not active, establishing...")
             return self.establish_tunnel()
         return True
 
 # 全局SSH隧道管理器
 ssh_tunnel_manager = SSHTunnelManager()
 
+class QueryResultCache:
+    """向量查询结果缓存，按归一化后的查询文本命中，带TTL和容量上限
+
+    反思循环中的后续查询经常只是大小写、标点或词序不同，归一化后即可复用结果，
+    避免重复走SSH隧道请求向量数据库。
+    """
+
+    _TOKEN_RE = re.compile(r"\w+")
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+
+    @classmethod
+    def normalize(cls, query: str) -> str:
+        """归一化查询：小写、去标点、词去重并排序"""
+        return " ".join(sorted(set(cls._TOKEN_RE.findall(query.casefold()))))
+
+    def get(self, key) -> Optional[dict]:
+        """返回未过期的缓存结果，未命中时返回None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, result = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def put(self, key, result: dict) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        self._entries[key] = (time.monotonic(), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
 class VectorAPIClient:
     """向量数据库API客户端"""
+
+    # 合并并发查询的时间窗口（秒）
+    BATCH_WINDOW = 0.01
     
     def __init__(self, base_url: str = "http://localhost:16060"):
         self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
+        self.cache = QueryResultCache()
+        # 并发查询合并为批量请求：(参数, 查询, future) 队列
+        self._pending = []
+        self._flush_task = None
+        self._batch_supported = True
     
-    def query_documents(
+    async def query_documents(
         self,
         query: str,
         max_retrieve_docs: int = 20,
@@ -254,55 +375,198 @@ class VectorAPIClient:
         enable_reflection: bool = False,
         timeout: int = 180  # 180秒超时，更快发现连接问题
     ) -> dict:
-        """查询文档，带超时处理和自动重连"""
+        """查询文档，优先返回缓存结果；只缓存成功的响应"""
+        cache_key = (
+            QueryResultCache.normalize(query),
+            max_retrieve_docs,
+            similarity_threshold,
+            enable_reflection,
+        )
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.debug("VectorAPIClient: cache hit for query: %s", query)
+            return cached
+
+        result = await self._query_documents_uncached(
+            query, max_retrieve_docs, similarity_threshold, enable_reflection, timeout
+        )
+        if "error" not in result:
+            self.cache.put(cache_key, result)
+        return result
+
+    async def _query_documents_uncached(
+        self,
+        query: str,
+        max_retrieve_docs: int,
+        similarity_threshold: float,
+        enable_reflection: bool,
+        timeout: int,
+    ) -> dict:
+        """排队等待合并为批量查询；同一时间窗口内的并发查询共用一次请求"""
         # 确保SSH隧道处于活跃状态
-        if not ssh_tunnel_manager.ensure_tunnel():
+        if not await asyncio.to_thread(ssh_tunnel_manager.ensure_tunnel):
             return {"error": "Failed to establish SSH tunnel", "timeout": False}
-        
-        payload = {
+
+        if not self._batch_supported:
+            return await self._post(
+                "/query",
+                self._payload(query, max_retrieve_docs, similarity_threshold, enable_reflection),
+                timeout,
+            )
+
+        params = (max_retrieve_docs, similarity_threshold, enable_reflection, timeout)
+        loop = asyncio.get_running_loop()
+        if self._flush_task is not None and self._flush_task.get_loop() is not loop:
+            # 上一个事件循环已结束，其排队的查询无法再完成
+            self._pending = []
+            self._flush_task = None
+        future = loop.create_future()
+        self._pending.append((params, query, future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+        return await future
+
+    async def _flush_after_window(self):
+        """等待BATCH_WINDOW收集并发查询，然后按参数分组发送"""
+        await asyncio.sleep(self.BATCH_WINDOW)
+        pending, self._pending = self._pending, []
+        self._flush_task = None
+
+        # 按参数分组；同组内归一化后相同的查询（与缓存键一致）只发送一次
+        groups: dict = {}
+        for params, query, future in pending:
+            group = groups.setdefault(params, {})
+            group.setdefault(QueryResultCache.normalize(query), (query, []))[1].append(future)
+
+        async def run_group(params, group):
+            max_retrieve_docs, similarity_threshold, enable_reflection, timeout = params
+            items = list(group.values())
+            try:
+                results = await self.query_batch(
+                    [query for query, _ in items],
+                    max_retrieve_docs=max_retrieve_docs,
+                    similarity_threshold=similarity_threshold,
+                    enable_reflection=enable_reflection,
+                    timeout=timeout,
+                )
+                for (_, futures), result in zip(items, results):
+                    for future in futures:
+                        if not future.done():
+                            future.set_result(result)
+            except Exception as e:
+                for _, futures in items:
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+
+        await asyncio.gather(*(run_group(params, group) for params, group in groups.items()))
+
+    async def query_batch(
+        self,
+        queries: list[str],
+        max_retrieve_docs: int = 20,
+        similarity_threshold: float = 0.6,
+        enable_reflection: bool = False,
+        timeout: int = 180,
+    ) -> list[dict]:
+        """批量查询文档，一次请求返回每个查询的结果（顺序与queries一致）
+
+        timeout 是整个调用的时间预算：批量请求超时时所有查询都返回超时错误，不再逐条重试。
+        服务端拒绝 /query_batch（任意4xx，如404未实现）时，关闭批量模式并回退为逐条并发查询；
+        返回5xx时仅本次回退。回退查询只使用剩余的时间预算。
+        """
+        deadline = time.monotonic() + timeout
+        if len(queries) > 1 and self._batch_supported:
+            payload = {
+                "queries": queries,
+                "max_retrieve_docs": max_retrieve_docs,
+                "similarity_threshold": similarity_threshold,
+                "enable_reflection": enable_reflection,
+            }
+            response = await self._post("/query_batch", payload, timeout)
+            status_code = response.get("status_code") or 0
+            if response.get("timeout"):
+                return [response] * len(queries)
+            elif 400 <= status_code < 500:
+                logger.info(
+                    "VectorAPIClient: /query_batch rejected (%s), falling back to single queries",
+                    status_code,
+                )
+                self._batch_supported = False
+            elif status_code >= 500:
+                logger.warning(
+                    "VectorAPIClient: /query_batch failed (%s), falling back to single queries",
+                    response.get("error"),
+                )
+            elif "error" in response:
+                return [response] * len(queries)
+            elif len(response.get("results", [])) == len(queries):
+                return response["results"]
+            else:
+                logger.warning("VectorAPIClient: unexpected /query_batch response, falling back to single queries")
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return [{"error": "Request timeout", "timeout": True}] * len(queries)
+        return await asyncio.gather(*(
+            self._post(
+                "/query",
+                self._payload(query, max_retrieve_docs, similarity_threshold, enable_reflection),
+                remaining,
+            )
+            for query in queries
+        ))
+
+    @staticmethod
+    def _payload(query, max_retrieve_docs, similarity_threshold, enable_reflection) -> dict:
+        return {
             "query": query,
             "max_retrieve_docs": max_retrieve_docs,
             "similarity_threshold": similarity_threshold,
             "enable_reflection": enable_reflection
         }
-        
+
+    async def _post(self, path: str, payload: dict, timeout: int) -> dict:
+        """发送请求，带超时处理和自动重连"""
         try:
-            response = self.session.post(
-                f"{self.base_url}/query",
-                json=payload,
+            response = await get_http_client(self.base_url).post(
+                f"{self.base_url}{path}",
+                content=orjson.dumps(payload),
                 headers={"Content-Type": "application/json"},
                 timeout=timeout
             )
             response.raise_for_status()
-            return response.json()
-        except requests.Timeout:
+            return orjson.loads(response.content)
+        except httpx.TimeoutException:
             return {"error": "Request timeout", "timeout": True}
-        except requests.ConnectionError:
+        except httpx.ConnectError:
             # 连接错误时，尝试重新建立隧道
-            print("[WARNING] Connection error, attempting to re-establish SSH tunnel")
-            if ssh_tunnel_manager.establish_tunnel():
+            logger.warning("Connection error, attempting to re-establish SSH tunnel")
+            if await asyncio.to_thread(ssh_tunnel_manager.establish_tunnel):
                 # 重试一次
                 try:
-                    response = self.session.post(
-                        f"{self.base_url}/query",
-                        json=payload,
+                    response = await get_http_client(self.base_url).post(
+                        f"{self.base_url}{path}",
+                        content=orjson.dumps(payload),
                         headers={"Content-Type": "application/json"},
                         timeout=timeout
                     )
                     response.raise_for_status()
-                    return response.json()
+                    return orjson.loads(response.content)
                 except Exception as retry_e:
                     return {"error": f"Connection failed after retry: {str(retry_e)}", "timeout": False}
             else:
                 return {"error": "SSH tunnel connection failed", "timeout": False}
-        except requests.RequestException as e:
+        except httpx.HTTPStatusError as e:
+            return {"error": str(e), "timeout": False, "status_code": e.response.status_code}
+        except httpx.HTTPError as e:
             return {"error": str(e), "timeout": False}
 
 # Initialize vector client
 vector_client = VectorAPIClient()
 
 # Nodes
-def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerationState:
+async def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerationState:
     """LangGraph node that generates a search queries based on the User's question.
 
     Uses Gemini 2.0 Flash to create an optimized search query for web research based on
@@ -315,80 +579,54 @@ def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerati
     Returns:
         Dictionary with state update, including search_query key containing the generated query
     """
-    print(f"[DEBUG] generate_query: Starting with state keys: {list(state.keys())}")
-    print(f"[DEBUG] generate_query: Messages: {state.get('messages', [])}")
-    print(f"[DEBUG] generate_query: Config: {config}")
-    
+    logger.debug("generate_query: Starting with state keys: %s", list(state))
+
     configurable = Configuration.from_runnable_config(config)
-    print(f"[DEBUG] generate_query: Configuration loaded")
-    print(f"[DEBUG] generate_query: Raw configurable object: {configurable}")
 
     # check for custom initial search query count
     if state.get("initial_search_query_count") is None:
         state["initial_search_query_count"] = configurable.number_of_initial_queries
     
-    print(f"[DEBUG] generate_query: Query count: {state['initial_search_query_count']}")
-
-    # init Gemini 2.0 Flash via OpenRouter
-    api_key = os.getenv("OPENROUTER_API_KEY")
-    print(f"[DEBUG] generate_query: OpenRouter API Key exists: {api_key is not None}")
-    
-    llm = ChatOpenAI(
-        model=QUERY_GENERATOR_MODEL,
-        temperature=1.0,
-        max_retries=2,
-        api_key=api_key,
-        base_url="https://openrouter.ai/api/v1",
-    )
-    structured_llm = llm.with_structured_output(SearchQueryList)
-    print(f"[DEBUG] generate_query: LLM initialized with OpenRouter")
+    logger.debug("generate_query: Query count: %s", state['initial_search_query_count'])
 
     # Format the prompt
     current_date = get_current_date()
     research_topic = get_research_topic(state["messages"])
-    print(f"[DEBUG] generate_query: Research topic: {research_topic}")
+    logger.debug("generate_query: Research topic: %s", research_topic)
     
-    formatted_prompt = query_writer_instructions.format(
+    formatted_prompt = query_writer_prompt(
         current_date=current_date,
         research_topic=research_topic,
         number_queries=state["initial_search_query_count"],
     )
-    print(f"[DEBUG] generate_query: Prompt formatted, calling LLM...")
+    logger.debug("generate_query: Prompt formatted, calling LLM...")
     
     # Generate the search queries
     try:
-        result = structured_llm.invoke(formatted_prompt)
-        print(f"[DEBUG] generate_query: LLM response received: {result}")
+        result = await _query_llm.ainvoke(formatted_prompt)
+        logger.debug("generate_query: LLM response received: %s", result)
         return {"query_list": result.query}
     except Exception as e:
-        print(f"[ERROR] generate_query: LLM call failed: {str(e)}")
+        logger.error("generate_query: LLM call failed: %s", str(e))
         raise
 
 
 def continue_to_web_research(state: QueryGenerationState):
-    """LangGraph node that sends the search queries to both web research and knowledge base research nodes.
+    """LangGraph node that sends the search queries to the research node.
 
-    This is used to spawn n number of research nodes for each search query.
+    This is used to spawn n number of research nodes for each search query;
+    each one runs the web and knowledge base searches concurrently.
     """
-    research_nodes = []
-    
-    # Add web research nodes
-    for idx, search_query in enumerate(state["query_list"]):
-        research_nodes.append(
-            Send("web_research", {"search_query": search_query, "id": int(idx * 2)})
-        )
-        # Add knowledge base research nodes
-        research_nodes.append(
-            Send("knowledge_base_research", {"search_query": search_query, "id": int(idx * 2 + 1)})
-        )
-    
-    return research_nodes
+    return [
+        Send("research", {"search_query": search_query, "id": int(idx)})
+        for idx, search_query in enumerate(state["query_list"])
+    ]
 
 
-def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
-    """LangGraph node that performs web research using a custom search client.
+async def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
+    """Perform web research using the custom search API.
 
-    Executes a web search using the custom search client with the specified base URL.
+    Executes a web search with search_cse against the custom search base URL.
 
     Args:
         state: Current graph state containing the search query and research loop count
@@ -399,26 +637,24 @@ def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
     """
     # Configure
     configurable = Configuration.from_runnable_config(config)
-    formatted_prompt = web_searcher_instructions.format(
-        current_date=get_current_date(),
-        research_topic=state["search_query"],
-    )
 
     # Use the custom search client
     try:
         search_query = state["search_query"]
-        print(f"[DEBUG] web_research: Search query: {search_query}")
+        logger.debug("web_research: Search query: %s", search_query)
         
         # Use the user's custom search engine ID
-        response = custom_search_client.cse().list(q=search_query, cx="c6d8fc3b5a4cb4090").execute()
+        response = await search_cse(search_query, "c6d8fc3b5a4cb4090")
         # Process the response as needed
         # For example, extract search results and format them
         search_results = response.get("items", [])
-        modified_text = "\n".join([item.get("snippet", "") for item in search_results])
         
-        # Create sources with both value, short_url, and label
+        # Create sources with both value, short_url, and label, and build the
+        # text in a single pass instead of rescanning the joined text per link
         sources_gathered = []
+        snippets = []
         for idx, item in enumerate(search_results):
+            snippet = item.get("snippet", "")
             link = item.get("link", "")
             title = item.get("title", "")
             if link:
@@ -430,9 +666,11 @@ def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
                     "label": title if title else f"Source {idx + 1}"
                 })
                 # Replace the full URL with short URL in the text
-                modified_text = modified_text.replace(link, short_url)
+                snippet = snippet.replace(link, short_url)
+            snippets.append(snippet)
+        modified_text = "\n".join(snippets)
     except Exception as e:
-        print(f"[ERROR] web_research: Custom search failed: {str(e)}")
+        logger.error("web_research: Custom search failed: %s", str(e))
         raise
 
     return {
@@ -442,8 +680,8 @@ def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
     }
 
 
-def knowledge_base_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
-    """LangGraph node that performs knowledge base research using vector database.
+async def knowledge_base_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
+    """Perform knowledge base research using vector database.
 
     Executes a semantic search on the vector database with timeout handling and progress tracking.
 
@@ -456,33 +694,14 @@ def knowledge_base_research(state: WebSearchState, config: RunnableConfig) -> Ov
     """
     try:
         search_query = state["search_query"]
-        print(f"[DEBUG] knowledge_base_research: Search query: {search_query}")
-        
-        # 返回初始进度状态
-        initial_status = {
-            "sources_gathered": [],
-            "search_query": [state["search_query"]],
-            "web_research_result": ["Starting knowledge base search..."],
-            "kb_search_status": "initializing",
-            "kb_search_progress": "Connecting to vector database...",
-        }
-        
-        # 确保SSH隧道连接
-        if not ssh_tunnel_manager.ensure_tunnel():
-            print(f"[ERROR] knowledge_base_research: SSH tunnel connection failed")
-            return {
-                "sources_gathered": [],
-                "search_query": [state["search_query"]],
-                "web_research_result": ["SSH tunnel connection failed"],
-                "kb_search_status": "failed",
-                "kb_search_progress": "SSH tunnel connection failed",
-            }
+        logger.debug("knowledge_base_research: Search query: %s", search_query)
         
+        # SSH隧道只在缓存未命中时由 vector_client 检查，缓存命中无需隧道
         # 更新进度：开始搜索
-        print(f"[INFO] knowledge_base_research: Starting vector search for: {search_query}")
+        logger.info("knowledge_base_research: Starting vector search for: %s", search_query)
         
         # Query the vector database with timeout
-        result = vector_client.query_documents(
+        result = await vector_client.query_documents(
             query=search_query,
             max_retrieve_docs=20,  # 使用20个文档以获得更全面的结果
             similarity_threshold=0.6,
@@ -492,7 +711,7 @@ def knowledge_base_research(state: WebSearchState, config: RunnableConfig) -> Ov
         
         if "error" in result:
             if result.get("timeout", False):
-                print(f"[WARNING] knowledge_base_research: Timeout after 30s - skipping vector search")
+                logger.warning("knowledge_base_research: Timeout after 30s - skipping vector search")
                 return {
                     "sources_gathered": [],
                     "search_query": [state["search_query"]],
@@ -501,7 +720,7 @@ def knowledge_base_research(state: WebSearchState, config: RunnableConfig) -> Ov
                     "kb_search_progress": result['error'],
                 }
             else:
-                print(f"[ERROR] knowledge_base_research: Connection error - {result['error']}")
+                logger.error("knowledge_base_research: Connection error - %s", result['error'])
                 return {
                     "sources_gathered": [],
                     "search_query": [state["search_query"]],
@@ -513,7 +732,7 @@ def knowledge_base_research(state: WebSearchState, config: RunnableConfig) -> Ov
         # Process successful results
         documents = result.get("documents", [])
         if not documents:
-            print(f"[INFO] knowledge_base_research: No documents found for query: {search_query}")
+            logger.info("knowledge_base_research: No documents found for query: %s", search_query)
             return {
                 "sources_gathered": [],
                 "search_query": [state["search_query"]],
@@ -523,26 +742,24 @@ def knowledge_base_research(state: WebSearchState, config: RunnableConfig) -> Ov
             }
         
         # 更新进度：处理结果
-        print(f"[INFO] knowledge_base_research: Processing {len(documents)} documents")
+        logger.info("knowledge_base_research: Processing %s documents", len(documents))
         
         # Format the results
-        formatted_content = f"Knowledge Base Search Results (Found {len(documents)} documents):\n\n"
+        content_parts = [f"Knowledge Base Search Results (Found {len(documents)} documents):\n\n"]
         sources_gathered = []
         
         for idx, doc in enumerate(documents):
             # Extract PubMed URL from source path IMMEDIATELY after getting from vector DB
-            try:
-                from agent.utils import format_kb_reference
-                pubmed_url = format_kb_reference(doc['source'])
-                print(f"[DEBUG] knowledge_base_research: Converted {doc['source']} to {pubmed_url}")
-            except ImportError:
-                pubmed_url = doc['source']
-                print(f"[DEBUG] knowledge_base_research: Import failed, using original path: {pubmed_url}")
+            pubmed_url = format_kb_reference(doc['source'])
+            logger.debug("knowledge_base_research: Converted %s to %s", doc['source'], pubmed_url)
             
-            # Create formatted content using PubMed URL
-            formatted_content += f"Document {idx + 1} (Score: {doc['score']:.3f}):\n"
-            formatted_content += f"Source: {pubmed_url}\n"  # Use PubMed URL instead of original path
-            formatted_content += f"Content: {doc['content']}\n\n"
+            # Create formatted content using PubMed URL, with the content truncated
+            # and tagged with its short URL reference
+            content_parts.append(
+                f"Document {idx + 1} (Score: {doc['score']:.3f}):\n"
+                f"Source: {pubmed_url}\n"  # Use PubMed URL instead of original path
+                f"Content: {doc['content'][:200]}... [{idx + 1}]\n\n"
+            )
             
             # Create source entry with PubMed URL
             source_entry = {
@@ -550,16 +767,11 @@ def knowledge_base_research(state: WebSearchState, config: RunnableConfig) -> Ov
                 "short_url": f"[{idx + 1}]",  # Use consistent numbering format
                 "label": doc.get('metadata', {}).get('filename', f"doc_{doc['id']}")
             }
-            print(f"[DEBUG] knowledge_base_research: Created source entry: {source_entry}")
+            logger.debug("knowledge_base_research: Created source entry: %s", source_entry)
             sources_gathered.append(source_entry)
-            
-            # Replace content with short URL reference
-            formatted_content = formatted_content.replace(
-                doc['content'], 
-                f"{doc['content'][:200]}... [{idx + 1}]"
-            )
         
-        print(f"[SUCCESS] knowledge_base_research: Found {len(documents)} documents")
+        formatted_content = "".join(content_parts)
+        logger.info("knowledge_base_research: Found %s documents", len(documents))
         return {
             "sources_gathered": sources_gathered,
             "search_query": [state["search_query"]],
@@ -569,7 +781,7 @@ def knowledge_base_research(state: WebSearchState, config: RunnableConfig) -> Ov
         }
         
     except Exception as e:
-        print(f"[ERROR] knowledge_base_research: Unexpected error: {str(e)}")
+        logger.error("knowledge_base_research: Unexpected error: %s", str(e))
         return {
             "sources_gathered": [],
             "search_query": [state["search_query"]],
@@ -579,13 +791,107 @@ def knowledge_base_research(state: WebSearchState, config: RunnableConfig) -> Ov
         }
 
 
-def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
+async def research(state: WebSearchState, config: RunnableConfig) -> OverallState:
+    """LangGraph node that runs web research and knowledge base research for one query.
+
+    Both searches are IO-bound, so they are awaited concurrently and their sources
+    and results are merged into a single state update.
+
+    Args:
+        state: Current graph state containing the search query
+        config: Configuration for the runnable
+
+    Returns:
+        Dictionary with state update, including sources_gathered, search_query, web_research_result
+        and the knowledge base search status
+    """
+    web, kb = await asyncio.gather(
+        web_research(state, config),
+        knowledge_base_research(state, config),
+        return_exceptions=True,
+    )
+
+    sources_gathered = []
+    web_research_result = []
+    for name, outcome in (("web_research", web), ("knowledge_base_research", kb)):
+        if isinstance(outcome, BaseException):
+            logger.error("research: %s failed: %s", name, outcome)
+            continue
+        sources_gathered.extend(outcome["sources_gathered"])
+        web_research_result.extend(outcome["web_research_result"])
+
+    # Report the knowledge base status so the UI can show timeouts and errors
+    if isinstance(kb, BaseException):
+        kb_search_status, kb_search_progress = "error", str(kb)
+    else:
+        kb_search_status, kb_search_progress = kb["kb_search_status"], kb["kb_search_progress"]
+
+    return {
+        "sources_gathered": sources_gathered,
+        "search_query": [state["search_query"]],
+        "web_research_result": web_research_result,
+        "kb_search_status": kb_search_status,
+        "kb_search_progress": kb_search_progress,
+    }
+
+
+def renumber_sources(sources: list) -> list:
+    """Renumber sources sequentially so every source has a globally unique marker."""
+    # Sources are already unique per URL (see merge_sources in state.py)
+    return [
+        {
+            "value": source["value"],
+            "short_url": f"[{idx}]",
+            "label": source.get("label", ""),
+        }
+        for idx, source in enumerate(sources, 1)
+    ]
+
+
+def build_answer_prompt(state: OverallState, deduplicated_sources: list) -> str:
+    """Build the final answer prompt from the research summaries and renumbered sources."""
+    # Use the enhanced citation function to prepare summaries
+    enhanced_summaries = enhance_research_summaries_with_citations(
+        state["web_research_result"],
+        deduplicated_sources,
+    )
+    logger.debug("build_answer_prompt: Enhanced summaries length: %s", len(enhanced_summaries))
+    return answer_prompt(
+        current_date=get_current_date(),
+        research_topic=get_research_topic(state["messages"]),
+        summaries=enhanced_summaries,
+    )
+
+
+def get_max_research_loops(state: dict, configurable: Configuration) -> int:
+    """Return the research loop limit, preferring the value set on the state."""
+    return (
+        state.get("max_research_loops")
+        if state.get("max_research_loops") is not None
+        else configurable.max_research_loops
+    )
+
+
+def _discard_task(task: asyncio.Task) -> None:
+    """Cancel a task whose result is no longer needed, retrieving any exception it raised."""
+    task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+async def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
     """LangGraph node that identifies knowledge gaps and generates potential follow-up queries.
 
     Analyzes the current summary to identify areas for further research and generates
     potential follow-up queries. Uses structured output to extract
     the follow-up query in JSON format.
 
+    The final answer only depends on the research gathered so far, so its LLM call is
+    started concurrently with the reflection call. If the research turns out to be
+    sufficient (or this is the last loop) the answer is handed to finalize_answer via
+    speculative_answer, saving a full LLM round trip; otherwise it is cancelled.
+    Speculation on non-final loops is opt-in through the speculative_answer
+    configuration option.
+
     Args:
         state: Current graph state containing the running summary and research topic
         config: Configuration for the runnable, including LLM provider settings
@@ -599,20 +905,36 @@ def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
 
     # Format the prompt
     current_date = get_current_date()
-    formatted_prompt = reflection_instructions.format(
+    formatted_prompt = reflection_prompt(
         current_date=current_date,
         research_topic=get_research_topic(state["messages"]),
         summaries="\n\n---\n\n".join(state["web_research_result"]),
     )
-    # init Reasoning Model via OpenRouter
-    llm = ChatOpenAI(
-        model=REFLECTION_MODEL,
-        temperature=1.0,
-        max_retries=2,
-        api_key=os.getenv("OPENROUTER_API_KEY"),
-        base_url="https://openrouter.ai/api/v1",
-    )
-    result = llm.with_structured_output(Reflection).invoke(formatted_prompt)
+
+    # Speculatively start the final answer alongside the reflection call
+    final_loop = state["research_loop_count"] >= get_max_research_loops(state, configurable)
+    answer_task = None
+    if final_loop or configurable.speculative_answer:
+        answer_prompt_text = build_answer_prompt(state, renumber_sources(state.get("sources_gathered", [])))
+        answer_task = asyncio.create_task(_answer_llm.ainvoke(answer_prompt_text))
+
+    try:
+        result = await _reflect_llm.ainvoke(formatted_prompt)
+    except BaseException:
+        if answer_task is not None:
+            _discard_task(answer_task)
+        raise
+
+    speculative_answer = None
+    if answer_task is not None:
+        if result.is_sufficient or final_loop:
+            try:
+                speculative_answer = (await answer_task).content
+            except Exception as e:
+                # finalize_answer will retry the call itself
+                logger.warning("reflection: Speculative answer failed: %s", e)
+        else:
+            _discard_task(answer_task)
 
     return {
         "is_sufficient": result.is_sufficient,
@@ -620,6 +942,7 @@ def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
         "follow_up_queries": result.follow_up_queries,
         "research_loop_count": state["research_loop_count"],
         "number_of_ran_queries": len(state["search_query"]),
+        "speculative_answer": speculative_answer,
     }
 
 
@@ -637,43 +960,26 @@ def evaluate_research(
         config: Configuration for the runnable, including max_research_loops setting
 
     Returns:
-        String literal indicating the next node to visit ("web_research", "knowledge_base_research", or "finalize_answer")
+        String literal indicating the next node to visit ("research" or "finalize_answer")
     """
     configurable = Configuration.from_runnable_config(config)
-    max_research_loops = (
-        state.get("max_research_loops")
-        if state.get("max_research_loops") is not None
-        else configurable.max_research_loops
-    )
+    max_research_loops = get_max_research_loops(state, configurable)
     if state["is_sufficient"] or state["research_loop_count"] >= max_research_loops:
         return "finalize_answer"
     else:
-        research_nodes = []
-        
-        # Add both web research and knowledge base research for each follow-up query
-        for idx, follow_up_query in enumerate(state["follow_up_queries"]):
-            base_id = state["number_of_ran_queries"] + int(idx * 2)
-            research_nodes.extend([
-                Send(
-                    "web_research",
-                    {
-                        "search_query": follow_up_query,
-                        "id": base_id,
-                    },
-                ),
-                Send(
-                    "knowledge_base_research",
-                    {
-                        "search_query": follow_up_query,
-                        "id": base_id + 1,
-                    },
-                )
-            ])
-        
-        return research_nodes
+        return [
+            Send(
+                "research",
+                {
+                    "search_query": follow_up_query,
+                    "id": state["number_of_ran_queries"] + int(idx),
+                },
+            )
+            for idx, follow_up_query in enumerate(state["follow_up_queries"])
+        ]
 
 
-def finalize_answer(state: OverallState, config: RunnableConfig):
+async def finalize_answer(state: OverallState, config: RunnableConfig):
     """LangGraph node that finalizes the research summary.
 
     Prepares the final output by deduplicating and formatting sources, then
@@ -689,72 +995,44 @@ def finalize_answer(state: OverallState, config: RunnableConfig):
     configurable = Configuration.from_runnable_config(config)
     sources = state.get("sources_gathered", [])
 
-    print(f"[DEBUG] finalize_answer: Number of sources: {len(sources)}")
-    print(f"[DEBUG] finalize_answer: ===== SOURCES_GATHERED DETAILS START =====")
-    for i, source in enumerate(sources):
-        print(f"[DEBUG] finalize_answer: Source {i+1}:")
-        print(f"[DEBUG] finalize_answer:   value: {source.get('value', 'N/A')}")
-        print(f"[DEBUG] finalize_answer:   short_url: {source.get('short_url', 'N/A')}")
-        print(f"[DEBUG] finalize_answer:   label: {source.get('label', 'N/A')}")
-    print(f"[DEBUG] finalize_answer: ===== SOURCES_GATHERED DETAILS END =====")
-
-    # Deduplicate and renumber sources to ensure global unique numbering
-    seen_values = set()
-    deduplicated_sources = []
-    
-    for source in sources:
-        value = source.get("value", "")
-        if value and value not in seen_values:
-            seen_values.add(value)
-            # Create new source with global unique numbering - simple sequential numbering
-            new_source = {
-                "value": value,
-                "short_url": f"[{len(deduplicated_sources) + 1}]",
-                "label": source.get("label", "")
-            }
-            deduplicated_sources.append(new_source)
+    logger.debug("finalize_answer: Number of sources: %s", len(sources))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("finalize_answer: ===== SOURCES_GATHERED DETAILS START =====")
+        for i, source in enumerate(sources):
+            logger.debug("finalize_answer: Source %s:", i+1)
+            logger.debug("finalize_answer:   value: %s", source.get('value', 'N/A'))
+            logger.debug("finalize_answer:   short_url: %s", source.get('short_url', 'N/A'))
+            logger.debug("finalize_answer:   label: %s", source.get('label', 'N/A'))
+        logger.debug("finalize_answer: ===== SOURCES_GATHERED DETAILS END =====")
+
+    # Renumber sources to ensure global unique numbering
+    deduplicated_sources = renumber_sources(sources)
     
-    print(f"[DEBUG] finalize_answer: After deduplication: {len(deduplicated_sources)} sources")
-    print(f"[DEBUG] finalize_answer: ===== DEDUPLICATED SOURCES START =====")
-    for i, source in enumerate(deduplicated_sources):
-        print(f"[DEBUG] finalize_answer: Source {i+1}:")
-        print(f"[DEBUG] finalize_answer:   value: {source.get('value', 'N/A')}")
-        print(f"[DEBUG] finalize_answer:   short_url: {source.get('short_url', 'N/A')}")
-        print(f"[DEBUG] finalize_answer:   label: {source.get('label', 'N/A')}")
-    print(f"[DEBUG] finalize_answer: ===== DEDUPLICATED SOURCES END =====")
-
-    # Use the enhanced citation function to prepare summaries
-    current_date = get_current_date()
-    enhanced_summaries = enhance_research_summaries_with_citations(
-        state["web_research_result"], 
-        deduplicated_sources  # Use deduplicated sources
-    )
-    
-    formatted_prompt = answer_instructions.format(
-        current_date=current_date,
-        research_topic=get_research_topic(state["messages"]),
-        summaries=enhanced_summaries,
-    )
-
-    print(f"[DEBUG] finalize_answer: Number of sources: {len(sources)}")
-    print(f"[DEBUG] finalize_answer: Enhanced summaries length: {len(enhanced_summaries)}")
-
-    # init Reasoning Model via OpenRouter
-    llm = ChatOpenAI(
-        model=ANSWER_MODEL,
-        temperature=0,
-        max_retries=2,
-        api_key=os.getenv("OPENROUTER_API_KEY"),
-        base_url="https://openrouter.ai/api/v1",
+    logger.debug("finalize_answer: After deduplication: %s sources", len(deduplicated_sources))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("finalize_answer: ===== DEDUPLICATED SOURCES START =====")
+        for i, source in enumerate(deduplicated_sources):
+            logger.debug("finalize_answer: Source %s:", i+1)
+            logger.debug("finalize_answer:   value: %s", source.get('value', 'N/A'))
+            logger.debug("finalize_answer:   short_url: %s", source.get('short_url', 'N/A'))
+            logger.debug("finalize_answer:   label: %s", source.get('label', 'N/A'))
+        logger.debug("finalize_answer: ===== DEDUPLICATED SOURCES END =====")
+
+    # Reuse the answer reflection generated speculatively from the same research
+    content = state.get("speculative_answer")
+    if content is None:
+        formatted_prompt = build_answer_prompt(state, deduplicated_sources)
+        result = await _answer_llm.ainvoke(formatted_prompt)
+        # Get the main content - LLM now generates markdown links directly
+        content = result.content
+    else:
+        logger.debug("finalize_answer: Using speculative answer from reflection")
+    logger.debug("finalize_answer: Generated content length: %s", len(content))
+    logger.debug(
+        "finalize_answer: ===== FULL GENERATED CONTENT START =====\n%s\n"
+        "finalize_answer: ===== FULL GENERATED CONTENT END =====",
+        content,
     )
-    result = llm.invoke(formatted_prompt)
-
-    # Get the main content - LLM now generates markdown links directly
-    content = result.content
-    print(f"[DEBUG] finalize_answer: Generated content length: {len(content)}")
-    print(f"[DEBUG] finalize_answer: ===== FULL GENERATED CONTENT START =====")
-    print(content)
-    print(f"[DEBUG] finalize_answer: ===== FULL GENERATED CONTENT END =====")
     
     # Post-process: Convert numeric citations to markdown links
     import re
@@ -785,18 +1063,18 @@ def finalize_answer(state: OverallState, config: RunnableConfig):
                                 sys.path.insert(0, current_dir)
                             from utils import format_kb_reference
                             pubmed_url = format_kb_reference(url)
-                            print(f"[DEBUG] finalize_answer: Converting {url} to {pubmed_url}")
+                            logger.debug("finalize_answer: Converting %s to %s", url, pubmed_url)
                             url = pubmed_url
                         except Exception as e:
-                            print(f"[DEBUG] finalize_answer: Failed to convert {url}: {e}")
+                            logger.debug("finalize_answer: Failed to convert %s: %s", url, e)
                             # Keep original URL if conversion fails
                     
                     markdown_links.append(f"[{num}]({url})")
                 else:
-                    print(f"[DEBUG] finalize_answer: Invalid citation index: {num}")
+                    logger.debug("finalize_answer: Invalid citation index: %s", num)
                     markdown_links.append(f"[{num}]")  # Keep original if invalid
             except ValueError:
-                print(f"[DEBUG] finalize_answer: Invalid citation number: {num}")
+                logger.debug("finalize_answer: Invalid citation number: %s", num)
                 markdown_links.append(f"[{num}]")  # Keep original if invalid
         
         return ', '.join(markdown_links)
@@ -804,26 +1082,30 @@ def finalize_answer(state: OverallState, config: RunnableConfig):
     # Replace all numeric citations with markdown links
     processed_content = re.sub(citation_pattern, replace_citation, content)
     
-    print(f"[DEBUG] finalize_answer: ===== PROCESSED CONTENT START =====")
-    print(processed_content)
-    print(f"[DEBUG] finalize_answer: ===== PROCESSED CONTENT END =====")
-    
-    # Validate that markdown links are present
-    markdown_link_pattern = r'\[\d+\]\([^)]+\)'
-    found_links = re.findall(markdown_link_pattern, processed_content)
-    print(f"[DEBUG] finalize_answer: Found {len(found_links)} valid markdown links in processed content")
-    
-    if found_links:
-        print(f"[DEBUG] finalize_answer: ===== FOUND MARKDOWN LINKS =====")
-        for i, link in enumerate(found_links, 1):
-            print(f"[DEBUG] finalize_answer: Link {i}: {link}")
-        print(f"[DEBUG] finalize_answer: ===== END MARKDOWN LINKS =====")
-    else:
-        print(f"[DEBUG] finalize_answer: ❌ NO MARKDOWN LINKS FOUND!")
+    logger.debug(
+        "finalize_answer: ===== PROCESSED CONTENT START =====\n%s\n"
+        "finalize_answer: ===== PROCESSED CONTENT END =====",
+        processed_content,
+    )
+
+    # Validate that markdown links are present (debug-only, scans the whole answer)
+    if logger.isEnabledFor(logging.DEBUG):
+        markdown_link_pattern = r'\[\d+\]\([^)]+\)'
+        found_links = re.findall(markdown_link_pattern, processed_content)
+        logger.debug("finalize_answer: Found %s valid markdown links in processed content", len(found_links))
+
+        if found_links:
+            logger.debug("finalize_answer: ===== FOUND MARKDOWN LINKS =====")
+            for i, link in enumerate(found_links, 1):
+                logger.debug("finalize_answer: Link %s: %s", i, link)
+            logger.debug("finalize_answer: ===== END MARKDOWN LINKS =====")
+        else:
+            logger.debug("finalize_answer: ❌ NO MARKDOWN LINKS FOUND!")
     
     return {
         "messages": [AIMessage(content=processed_content)],
         "sources_gathered": deduplicated_sources,  # Use deduplicated sources
+        "speculative_answer": None,
     }
 
 
@@ -832,8 +1114,7 @@ builder = StateGraph(OverallState, config_schema=Configuration)
 
 # Define the nodes we will cycle between
 builder.add_node("generate_query", generate_query)
-builder.add_node("web_research", web_research)
-builder.add_node("knowledge_base_research", knowledge_base_research)
+builder.add_node("research", research)
 builder.add_node("reflection", reflection)
 builder.add_node("finalize_answer", finalize_answer)
 
@@ -842,15 +1123,13 @@ builder.add_node("finalize_answer", finalize_answer)
 builder.add_edge(START, "generate_query")
 # Add conditional edge to continue with search queries in a parallel branch
 builder.add_conditional_edges(
-    "generate_query", continue_to_web_research, ["web_research", "knowledge_base_research"]
+    "generate_query", continue_to_web_research, ["research"]
 )
-# Reflect on the web research
-builder.add_edge("web_research", "reflection")
-# Reflect on the knowledge base research
-builder.add_edge("knowledge_base_research", "reflection")
+# Reflect on the web and knowledge base research
+builder.add_edge("research", "reflection")
 # Evaluate the research
 builder.add_conditional_edges(
-    "reflection", evaluate_research, ["web_research", "knowledge_base_research", "finalize_answer"]
+    "reflection", evaluate_research, ["research", "finalize_answer"]
 )
 # Finalize the answer
 builder.add_edge("finalize_answer", END)
@@ -1,9 +1,42 @@
-from datetime import datetime
+import string
+from datetime import date
+from functools import lru_cache
 
 
-# Get current date in a readable format
+@lru_cache(maxsize=1)
+def _format_date(day: date) -> str:
+    return day.strftime("%B %d, %Y")
+
+
+# Get current date in a readable format, formatted once per day
 def get_current_date():
-    return datetime.now().strftime("%B %d, %Y")
+    return _format_date(date.today())
+
+
+def compile_prompt(template: str):
+    """Pre-split a ``str.format`` template so rendering skips re-parsing it.
+
+    Returns a callable taking the same keyword arguments as ``template.format``.
+    Templates using conversions or format specs fall back to ``str.format``.
+    """
+    parts = tuple(
+        (literal, field, conversion, spec)
+        for literal, field, spec, conversion in string.Formatter().parse(template)
+    )
+    if any(conversion or spec for _, _, conversion, spec in parts):
+        return template.format
+
+    segments = tuple((literal, field) for literal, field, _, _ in parts)
+
+    def render(**kwargs) -> str:
+        out = []
+        for literal, field in segments:
+            out.append(literal)
+            if field is not None:
+                out.append(str(kwargs[field]))
+        return "".join(out)
+
+    return render
 
 
 query_writer_instructions = """Your goal is to generate sophisticated and diverse web search queries. These queries are intended for an advanced automated web research tool capable of analyzing complex results, following links, and synthesizing information.
@@ -109,3 +142,8 @@ User Context:
 
 Summaries:
 {summaries}"""
+
+
+query_writer_prompt = compile_prompt(query_writer_instructions)
+reflection_prompt = compile_prompt(reflection_instructions)
+answer_prompt = compile_prompt(answer_instructions)
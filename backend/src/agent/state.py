@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import TypedDict
+from typing import Optional, TypedDict
 
+from langgraph.channels import Topic
 from langgraph.graph import add_messages
 from typing_extensions import Annotated
 
@@ -12,15 +13,38 @@ from dataclasses import dataclass, field
 from typing_extensions import Annotated
 
 
+def merge_sources(left: list, right: list) -> list:
+    """Merge two source lists, keeping a single entry per source URL.
+
+    Sources are keyed by their ``value``. The first occurrence keeps its position
+    and later entries for the same URL replace its contents, so re-numbered
+    sources written back by ``finalize_answer`` update the state in place.
+    Entries without a ``value`` are dropped.
+    """
+    merged = {source["value"]: source for source in left if source.get("value")}
+    for source in right:
+        value = source.get("value")
+        if value:
+            merged[value] = source
+    return list(merged.values())
+
+
 class OverallState(TypedDict):
     messages: Annotated[list, add_messages]
-    search_query: Annotated[list, operator.add]
-    web_research_result: Annotated[list, operator.add]
-    sources_gathered: Annotated[list, operator.add]
+    # Accumulating topics collect all fan-out results of a step with a single
+    # in-place extend, instead of one list concatenation per research branch
+    search_query: Annotated[list, Topic(str, accumulate=True)]
+    web_research_result: Annotated[list, Topic(str, accumulate=True)]
+    sources_gathered: Annotated[list, merge_sources]
     initial_search_query_count: int
     max_research_loops: int
     research_loop_count: int
     reasoning_model: str
+    speculative_answer: Optional[str]
+    # Knowledge base search status of each research branch, only reported in the
+    # step's stream updates for the UI; non-accumulating topics are cleared every step
+    kb_search_status: Annotated[list, Topic(str)]
+    kb_search_progress: Annotated[list, Topic(str)]
 
 
 class ReflectionState(TypedDict):
@@ -29,6 +53,7 @@ class ReflectionState(TypedDict):
     follow_up_queries: Annotated[list, operator.add]
     research_loop_count: int
     number_of_ran_queries: int
+    speculative_answer: Optional[str]
 
 
 class Query(TypedDict):
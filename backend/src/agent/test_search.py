@@ -1,11 +1,10 @@
 import os
 import requests
 from urllib.parse import urlencode
-from dotenv import load_dotenv
+from dotenv import find_dotenv, load_dotenv
 
 # Load environment variables
-env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.env')
-load_dotenv(env_path)
+load_dotenv(find_dotenv(usecwd=True), override=False)
 
 def test_search_api():
     # Get API key from environment
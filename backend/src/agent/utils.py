@@ -1,6 +1,46 @@
+import logging
+import re
+from functools import lru_cache
 from typing import Any, Dict, List
 from langchain_core.messages import AnyMessage, AIMessage, HumanMessage
 
+logger = logging.getLogger(__name__)
+
+# PubMed ID in knowledge base filenames, e.g. ..._22284798_auto_22284798.md,
+# falling back to any number sequence before .md
+_PUBMED_RE = re.compile(r'_(\d+)_auto_\d+\.md$|_(\d+)\.md$')
+# Citation markers ([KB-1] or [1]), optionally followed by a markdown link target
+_CITATION_RE = re.compile(r'(\[(?:KB-\d+|\d+)\])(?:\([^)]+\))?')
+
+# Conversation role prefixes used when flattening message history
+_ROLE_PREFIX = {HumanMessage: "User: ", AIMessage: "Assistant: "}
+
+# Guidance appended to the research summaries for simple numeric citation generation
+_CITATION_GUIDANCE = """
+
+CITATION INSTRUCTIONS:
+- Use simple bracket format: [1], [2], [3], etc.
+- Place citations immediately after relevant claims or facts
+- You can combine multiple citations: [1, 2, 3]
+- Do NOT include URLs or links in your citations
+- The backend will handle converting these to proper links
+
+EXAMPLE:
+"This is a fact [1]. Multiple sources support this [2, 3]."
+"""
+
+
+def _role_prefix(message: AnyMessage) -> str:
+    """
+    Look up the role prefix for a message, falling back to isinstance for subclasses.
+    """
+    prefix = _ROLE_PREFIX.get(type(message))
+    if prefix is None:
+        for message_type, type_prefix in _ROLE_PREFIX.items():
+            if isinstance(message, message_type):
+                return type_prefix
+    return prefix
+
 
 def get_research_topic(messages: List[AnyMessage]) -> str:
     """
@@ -10,12 +50,12 @@ def get_research_topic(messages: List[AnyMessage]) -> str:
     if len(messages) == 1:
         research_topic = messages[-1].content
     else:
-        research_topic = ""
+        parts = []
         for message in messages:
-            if isinstance(message, HumanMessage):
-                research_topic += f"User: {message.content}\n"
-            elif isinstance(message, AIMessage):
-                research_topic += f"Assistant: {message.content}\n"
+            prefix = _role_prefix(message)
+            if prefix:
+                parts.append(f"{prefix}{message.content}\n")
+        research_topic = "".join(parts)
     return research_topic
 
 
@@ -35,17 +75,17 @@ def format_research_citations(sources_gathered: List[Dict]) -> str:
     if not sources_gathered:
         return ""
     
-    formatted_sources = "\n\nAvailable Sources for Citation:\n"
+    parts = ["\n\nAvailable Sources for Citation:\n"]
     for idx, source in enumerate(sources_gathered, 1):
         value = source.get("value", "")
         label = source.get("label", "")
-        short_url = source.get("short_url", "")
         
         # Determine source type and format appropriately
-        if short_url.startswith("[KB-"):
+        if source.get("short_url", "").startswith("[KB-"):
             # Knowledge base source
             if label and not label.startswith("doc_"):
-                filename = label.rsplit('.', 1)[0] if '.' in label else label
+                head, sep, _ = label.rpartition('.')
+                filename = head if sep else label
                 source_desc = f"Knowledge Base Document: {filename}"
             else:
                 source_desc = f"Knowledge Base: {value}"
@@ -53,12 +93,13 @@ def format_research_citations(sources_gathered: List[Dict]) -> str:
             # Web source
             source_desc = f"Web Source: {label}" if label else f"Web Source: {value}"
         
-        formatted_sources += f"[#{idx}] {source_desc}\n"
+        parts.append(f"[#{idx}] {source_desc}\n")
     
-    formatted_sources += "\nPlease use [#N] notation to cite sources in your response.\n"
-    return formatted_sources
+    parts.append("\nPlease use [#N] notation to cite sources in your response.\n")
+    return "".join(parts)
 
 
+@lru_cache(maxsize=1024)
 def extract_pubmed_id_from_kb_path(kb_path: str) -> str:
     """
     Extract PubMed ID from knowledge base file path.
@@ -72,26 +113,16 @@ def extract_pubmed_id_from_kb_path(kb_path: str) -> str:
     Returns:
         str: PubMed ID if found, empty string otherwise
     """
-    import re
-    import os
-    
-    # Get filename from path
-    filename = os.path.basename(kb_path)
+    # Get filename from path (knowledge base paths are always POSIX paths)
+    filename = kb_path.rpartition('/')[2]
     
     # Pattern to match PubMed ID: numbers between underscores, before _auto_
-    # Looking for pattern like: _22284798_auto_
-    pattern = r'_(\d+)_auto_\d+\.md$'
-    match = re.search(pattern, filename)
+    # (looking for pattern like: _22284798_auto_), or any number sequence before .md.
+    # The _auto_ form always starts earlier in the filename, so it wins when both match
+    match = _PUBMED_RE.search(filename)
     
     if match:
-        return match.group(1)
-    
-    # Fallback: look for any number sequence before .md
-    fallback_pattern = r'_(\d+)\.md$'
-    fallback_match = re.search(fallback_pattern, filename)
-    
-    if fallback_match:
-        return fallback_match.group(1)
+        return match.group(1) or match.group(2)
     
     return ""
 
@@ -107,6 +138,15 @@ def format_kb_reference(kb_path: str, label: str = "") -> str:
     Returns:
         str: Formatted PubMed URL or original path if PubMed ID not found
     """
+    # The label does not affect the URL, so only the path is used as cache key
+    return _format_kb_reference(kb_path)
+
+
+@lru_cache(maxsize=1024)
+def _format_kb_reference(kb_path: str) -> str:
+    """
+    Memoized PubMed URL for a knowledge base path, see format_kb_reference.
+    """
     pubmed_id = extract_pubmed_id_from_kb_path(kb_path)
     
     if pubmed_id:
@@ -129,16 +169,14 @@ def create_references_section(sources_gathered: List[Dict]) -> str:
     if not sources_gathered:
         return ""
     
-    references = []
+    references = ["\n\n## References"]
     for idx, source in enumerate(sources_gathered, 1):
         value = source.get("value", "")
-        label = source.get("label", "")
-        short_url = source.get("short_url", "")
         
         # Format reference based on source type
-        if short_url.startswith("[KB-"):
+        if source.get("short_url", "").startswith("[KB-"):
             # Knowledge base source - convert to PubMed URL
-            pubmed_url = format_kb_reference(value, label)
+            pubmed_url = format_kb_reference(value, source.get("label", ""))
             reference_text = f"[{idx}] {pubmed_url}"
         else:
             # Web source - use full URL with number first
@@ -147,7 +185,7 @@ def create_references_section(sources_gathered: List[Dict]) -> str:
         references.append(reference_text)
     
     # Join with line breaks for better visualization
-    return "\n\n## References\n\n" + "\n\n".join(references)
+    return "\n\n".join(references)
 
 
 def resolve_urls(urls_to_resolve: List[Any], id: int) -> Dict[str, str]:
@@ -155,14 +193,12 @@ def resolve_urls(urls_to_resolve: List[Any], id: int) -> Dict[str, str]:
     Create a map of the vertex ai search urls (very long) to a short url with a unique id for each url.
     Ensures each original URL gets a consistent shortened form while maintaining uniqueness.
     """
-    prefix = f"https://vertexaisearch.cloud.google.com/id/"
-    urls = [site.web.uri for site in urls_to_resolve]
+    base = f"https://vertexaisearch.cloud.google.com/id/{id}-"
 
     # Create a dictionary that maps each unique URL to its first occurrence index
     resolved_map = {}
-    for idx, url in enumerate(urls):
-        if url not in resolved_map:
-            resolved_map[url] = f"{prefix}{id}-{idx}"
+    for idx, site in enumerate(urls_to_resolve):
+        resolved_map.setdefault(site.web.uri, base + str(idx))
 
     return resolved_map
 
@@ -181,29 +217,29 @@ def insert_citation_markers(text, citations_list):
     Returns:
         str: The text with citation markers inserted.
     """
-    # Sort citations by end_index in descending order.
-    # If end_index is the same, secondary sort by start_index descending.
-    # This ensures that insertions at the end of the string don't affect
-    # the indices of earlier parts of the string that still need to be processed.
+    # Sort citations by end_index in ascending order.
+    # If end_index is the same, secondary sort by start_index ascending.
+    # Sorting the reversed list keeps the marker order of the former
+    # back-to-front insertion for citations with identical indices.
     sorted_citations = sorted(
-        citations_list, key=lambda c: (c["end_index"], c["start_index"]), reverse=True
+        reversed(citations_list), key=lambda c: (c["end_index"], c["start_index"])
     )
 
-    modified_text = text
+    # Walk the original text once, emitting slices and markers
+    parts = []
+    cursor = 0
     for citation_info in sorted_citations:
-        # These indices refer to positions in the *original* text,
-        # but since we iterate from the end, they remain valid for insertion
-        # relative to the parts of the string already processed.
+        # These indices refer to positions in the *original* text
         end_idx = citation_info["end_index"]
-        marker_to_insert = ""
-        for segment in citation_info["segments"]:
-            marker_to_insert += f" [{segment['label']}]({segment['short_url']})"
-        # Insert the citation marker at the original end_idx position
-        modified_text = (
-            modified_text[:end_idx] + marker_to_insert + modified_text[end_idx:]
+        parts.append(text[cursor:end_idx])
+        parts.extend(
+            f" [{segment['label']}]({segment['short_url']})"
+            for segment in citation_info["segments"]
         )
+        cursor = end_idx
+    parts.append(text[cursor:])
 
-    return modified_text
+    return "".join(parts)
 
 
 def get_citations(response, resolved_urls_map):
@@ -250,6 +286,8 @@ def get_citations(response, resolved_urls_map):
     ):
         return citations
 
+    grounding_chunks = getattr(candidate.grounding_metadata, "grounding_chunks", None) or []
+    resolve = resolved_urls_map.get
     for support in candidate.grounding_metadata.grounding_supports:
         citation = {}
 
@@ -272,27 +310,31 @@ def get_citations(response, resolved_urls_map):
         citation["start_index"] = start_index
         citation["end_index"] = support.segment.end_index
 
-        citation["segments"] = []
+        segments = []
+        append_segment = segments.append
         if (
             hasattr(support, "grounding_chunk_indices")
             and support.grounding_chunk_indices
         ):
             for ind in support.grounding_chunk_indices:
                 try:
-                    chunk = candidate.grounding_metadata.grounding_chunks[ind]
-                    resolved_url = resolved_urls_map.get(chunk.web.uri, None)
-                    citation["segments"].append(
+                    web = grounding_chunks[ind].web
+                    uri = web.uri
+                    title = web.title
+                    append_segment(
                         {
-                            "label": chunk.web.title.split(".")[:-1][0],
-                            "short_url": resolved_url,
-                            "value": chunk.web.uri,
+                            # Label is the title up to the first dot (e.g. the domain name)
+                            "label": title.partition(".")[0] if title else "",
+                            "short_url": resolve(uri),
+                            "value": uri,
                         }
                     )
-                except (IndexError, AttributeError, NameError):
-                    # Handle cases where chunk, web, uri, or resolved_map might be problematic
+                except (IndexError, AttributeError):
+                    # Handle cases where chunk, web, or uri might be problematic
                     # For simplicity, we'll just skip adding this particular segment link
                     # In a production system, you might want to log this.
                     pass
+        citation["segments"] = segments
         citations.append(citation)
     return citations
 
@@ -315,7 +357,12 @@ def prepare_content_with_citations(content_segments: List[Dict], sources_gathere
     if not content_segments or not sources_gathered:
         return ""
     
-    formatted_content = ""
+    # Citation marker of each source, looked up by index below
+    markers = tuple(
+        source.get("short_url", f"[{idx}]") for idx, source in enumerate(sources_gathered)
+    )
+    n_sources = len(markers)
+    parts = []
     
     for segment in content_segments:
         content = segment.get("content", "")
@@ -323,23 +370,21 @@ def prepare_content_with_citations(content_segments: List[Dict], sources_gathere
         
         if content:
             # Add the content
-            formatted_content += content
+            parts.append(content)
             
             # Add citation markers if available
             if source_indices:
-                citation_markers = []
-                for idx in source_indices:
-                    if 0 <= idx < len(sources_gathered):
-                        source = sources_gathered[idx]
-                        marker = source.get("short_url", f"[{idx}]")
-                        citation_markers.append(marker)
+                citation_markers = [
+                    markers[idx] for idx in source_indices if 0 <= idx < n_sources
+                ]
                 
                 if citation_markers:
-                    formatted_content += " " + "".join(citation_markers)
+                    parts.append(" ")
+                    parts.extend(citation_markers)
             
-            formatted_content += "\n\n"
+            parts.append("\n\n")
     
-    return formatted_content
+    return "".join(parts)
 
 
 def enhance_research_summaries_with_citations(summaries: List[str], sources_gathered: List[Dict]) -> str:
@@ -361,7 +406,7 @@ def enhance_research_summaries_with_citations(summaries: List[str], sources_gath
     
     # Create simple source mapping for LLM
     if sources_gathered:
-        source_mapping = "\n\nAVAILABLE SOURCES FOR CITATION:\n"
+        parts = [combined_summaries, "\n\nAVAILABLE SOURCES FOR CITATION:\n"]
         for idx, source in enumerate(sources_gathered, 1):
             value = source.get("value", "")
             label = source.get("label", "")
@@ -372,27 +417,17 @@ def enhance_research_summaries_with_citations(summaries: List[str], sources_gath
             else:
                 source_type = "Web Source"
             
-            source_mapping += f"[{idx}] - {source_type}: {label}\n"
-        
-        enhanced_content = combined_summaries + source_mapping
+            parts.append(f"[{idx}] - {source_type}: {label}\n")
         
         # Add guidance for simple numeric citation generation
-        enhanced_content += """
-
-CITATION INSTRUCTIONS:
-- Use simple bracket format: [1], [2], [3], etc.
-- Place citations immediately after relevant claims or facts
-- You can combine multiple citations: [1, 2, 3]
-- Do NOT include URLs or links in your citations
-- The backend will handle converting these to proper links
-
-EXAMPLE:
-"This is a fact [1]. Multiple sources support this [2, 3]."
-"""
+        parts.append(_CITATION_GUIDANCE)
+        enhanced_content = "".join(parts)
         
-        print(f"[DEBUG] enhance_research_summaries_with_citations: ===== ENHANCED SUMMARIES FOR LLM START =====")
-        print(enhanced_content)
-        print(f"[DEBUG] enhance_research_summaries_with_citations: ===== ENHANCED SUMMARIES FOR LLM END =====")
+        logger.debug(
+            "enhance_research_summaries_with_citations: ===== ENHANCED SUMMARIES FOR LLM START =====\n%s\n"
+            "enhance_research_summaries_with_citations: ===== ENHANCED SUMMARIES FOR LLM END =====",
+            enhanced_content,
+        )
         
         return enhanced_content
     
@@ -417,33 +452,44 @@ def create_traced_content_segments(content: str, source_mapping: Dict[str, int],
     if not content or not source_mapping or not sources_gathered:
         return content
     
-    traced_content = ""
-    remaining_content = content
+    n_sources = len(sources_gathered)
+    
+    # A single snippet needs no ordering: splice it in with one str.replace
+    if len(source_mapping) == 1:
+        (snippet, source_idx), = source_mapping.items()
+        if not 0 <= source_idx < n_sources:
+            return content
+        source_marker = sources_gathered[source_idx].get("short_url", f"[{source_idx}]")
+        return content.replace(snippet, f"{snippet} {source_marker}", 1)
     
-    # Sort source mappings by their position in the content
-    sorted_mappings = sorted(source_mapping.items(), key=lambda x: content.find(x[0]))
+    # Locate each snippet once and sort the mappings by their position in the content
+    positions = {snippet: content.find(snippet) for snippet in source_mapping}
+    sorted_mappings = sorted(source_mapping.items(), key=lambda x: positions[x[0]])
     
+    parts = []
+    cursor = 0
     for snippet, source_idx in sorted_mappings:
-        if snippet in remaining_content and 0 <= source_idx < len(sources_gathered):
-            # Find the position of this snippet
-            snippet_start = remaining_content.find(snippet)
-            
-            # Add content before the snippet
-            if snippet_start > 0:
-                traced_content += remaining_content[:snippet_start]
-            
-            # Add the snippet with its source marker
-            source = sources_gathered[source_idx]
-            source_marker = source.get("short_url", f"[{source_idx}]")
-            traced_content += f"{snippet} {source_marker}"
-            
-            # Update remaining content
-            remaining_content = remaining_content[snippet_start + len(snippet):]
+        if not 0 <= source_idx < n_sources:
+            continue
+        
+        # Find the position of this snippet after the content already processed
+        snippet_start = positions[snippet]
+        if snippet_start < cursor:
+            snippet_start = content.find(snippet, cursor)
+        if snippet_start < 0:
+            continue
+        
+        # Add content before the snippet, then the snippet with its source marker
+        source = sources_gathered[source_idx]
+        source_marker = source.get("short_url", f"[{source_idx}]")
+        parts.append(content[cursor:snippet_start])
+        parts.append(f"{snippet} {source_marker}")
+        cursor = snippet_start + len(snippet)
     
     # Add any remaining content
-    traced_content += remaining_content
+    parts.append(content[cursor:])
     
-    return traced_content
+    return "".join(parts)
 
 
 def validate_citations_in_content(content: str, sources_gathered: List[Dict]) -> Dict[str, List[str]]:
@@ -457,40 +503,27 @@ def validate_citations_in_content(content: str, sources_gathered: List[Dict]) ->
     Returns:
         Dict with 'valid_citations', 'invalid_citations', and 'missing_sources'
     """
-    import re
-    
-    # Extract all citation markers from content
-    # Updated pattern to match both original markers and markdown links
-    citation_pattern = r'\[(?:KB-\d+|\d+)\](?:\([^)]+\))?'
-    found_citations = re.findall(citation_pattern, content)
-    
-    # Clean citations to get the marker part only (remove URLs if present)
-    clean_citations = []
-    for citation in found_citations:
-        # Extract just the marker part: [KB-1] or [1]
-        marker_match = re.match(r'(\[(?:KB-\d+|\d+)\])', citation)
-        if marker_match:
-            clean_citations.append(marker_match.group(1))
-    
     # Get available citation markers from sources
-    available_markers = set()
-    for source in sources_gathered:
-        marker = source.get("short_url", "")
-        if marker:
-            available_markers.add(marker)
+    available_markers = frozenset(
+        marker for marker in (source.get("short_url", "") for source in sources_gathered) if marker
+    )
     
-    # Validate citations
+    # Extract and validate citation markers in a single pass over the content.
+    # The pattern matches both original markers and markdown links; group 1 is
+    # just the marker part (URLs removed)
     valid_citations = []
     invalid_citations = []
+    cited_markers = set()
     
-    for citation in clean_citations:
+    for match in _CITATION_RE.finditer(content):
+        citation = match.group(1)
+        cited_markers.add(citation)
         if citation in available_markers:
             valid_citations.append(citation)
         else:
             invalid_citations.append(citation)
     
     # Check for sources that weren't cited
-    cited_markers = set(clean_citations)
     missing_sources = [marker for marker in available_markers if marker not in cited_markers]
     
     return {
@@ -0,0 +1,5 @@
+import os
+
+# agent.graph validates the API keys at import time; the unit tests never call the APIs
+for key in ("OPENROUTER_API_KEY", "GEMINI_API_KEY", "GOOGLE_API_KEY"):
+    os.environ.setdefault(key, "test-key")
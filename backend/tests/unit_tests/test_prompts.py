@@ -0,0 +1,41 @@
+import pytest
+
+from agent.prompts import (
+    answer_instructions,
+    answer_prompt,
+    compile_prompt,
+    query_writer_instructions,
+    query_writer_prompt,
+    reflection_instructions,
+    reflection_prompt,
+)
+
+KWARGS = {
+    "current_date": "January 01, 2025",
+    "research_topic": "What is {not} a field?",
+    "number_queries": 3,
+    "summaries": "summary one\n\n---\n\nsummary {two}",
+}
+
+
+@pytest.mark.parametrize(
+    ("template", "prompt"),
+    [
+        (query_writer_instructions, query_writer_prompt),
+        (reflection_instructions, reflection_prompt),
+        (answer_instructions, answer_prompt),
+    ],
+)
+def test_compiled_prompt_matches_str_format(template, prompt):
+    assert prompt(**KWARGS) == template.format(**KWARGS)
+
+
+def test_compile_prompt_falls_back_for_format_specs():
+    template = "{value:>5}|{name!r}"
+
+    assert compile_prompt(template)(value=1, name="x") == template.format(value=1, name="x")
+
+
+def test_compile_prompt_missing_field_raises_key_error():
+    with pytest.raises(KeyError):
+        compile_prompt("Hello {name}")()
@@ -0,0 +1,30 @@
+from agent.state import merge_sources
+
+
+def source(value, label=""):
+    return {"value": value, "short_url": f"[{value}]", "label": label}
+
+
+def test_merge_sources_keeps_first_position_and_appends_new():
+    left = [source("a"), source("b")]
+    right = [source("c"), source("a")]
+
+    merged = merge_sources(left, right)
+
+    assert [s["value"] for s in merged] == ["a", "b", "c"]
+
+
+def test_merge_sources_later_entry_replaces_contents():
+    left = [source("a", "old"), source("b")]
+    right = [{"value": "a", "short_url": "[1]", "label": "new"}]
+
+    merged = merge_sources(left, right)
+
+    assert merged[0] == {"value": "a", "short_url": "[1]", "label": "new"}
+    assert [s["value"] for s in merged] == ["a", "b"]
+
+
+def test_merge_sources_drops_entries_without_value():
+    merged = merge_sources([source(""), {"label": "x"}], [source("a"), {"value": None}])
+
+    assert merged == [source("a")]
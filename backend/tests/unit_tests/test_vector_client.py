@@ -0,0 +1,187 @@
+import asyncio
+import importlib
+
+import httpx
+import orjson
+import pytest
+
+graph = importlib.import_module("agent.graph")
+
+
+class FakeVectorServer:
+    """Mock transport for the vector database that records every request."""
+
+    def __init__(self, batch_status=200, batch_timeout=False):
+        self.batch_status = batch_status
+        self.batch_timeout = batch_timeout
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        body = orjson.loads(request.content)
+        self.requests.append((request.url.path, body))
+        if request.url.path == "/query_batch":
+            if self.batch_timeout:
+                raise httpx.ReadTimeout("batch timed out", request=request)
+            if self.batch_status != 200:
+                return httpx.Response(self.batch_status, request=request)
+            results = [{"documents": [query]} for query in body["queries"]]
+            return httpx.Response(200, content=orjson.dumps({"results": results}), request=request)
+        return httpx.Response(200, content=orjson.dumps({"documents": [body["query"]]}), request=request)
+
+    def paths(self):
+        return [path for path, _ in self.requests]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeVectorServer()
+    monkeypatch.setattr(graph.ssh_tunnel_manager, "ensure_tunnel", lambda: True)
+    monkeypatch.setattr(
+        graph,
+        "get_http_client",
+        lambda base_url: httpx.AsyncClient(transport=httpx.MockTransport(server.handler)),
+    )
+    return server
+
+
+def query_all(client, queries, **kwargs):
+    async def run():
+        return await asyncio.gather(*(client.query_documents(query, **kwargs) for query in queries))
+
+    return asyncio.run(run())
+
+
+def test_concurrent_queries_are_sent_as_one_batch(server):
+    client = graph.VectorAPIClient()
+
+    results = query_all(client, ["alpha", "beta", "gamma"])
+
+    assert server.requests == [
+        (
+            "/query_batch",
+            {
+                "queries": ["alpha", "beta", "gamma"],
+                "max_retrieve_docs": 20,
+                "similarity_threshold": 0.6,
+                "enable_reflection": False,
+            },
+        )
+    ]
+    assert results == [{"documents": ["alpha"]}, {"documents": ["beta"]}, {"documents": ["gamma"]}]
+
+
+def test_duplicate_normalized_queries_are_sent_once(server):
+    client = graph.VectorAPIClient()
+
+    results = query_all(client, ["Autism genes", "genes, autism", "diet"])
+
+    assert server.requests[0][1]["queries"] == ["Autism genes", "diet"]
+    assert len(server.requests) == 1
+    assert results[0] == results[1] == {"documents": ["Autism genes"]}
+    assert results[2] == {"documents": ["diet"]}
+
+
+def test_queries_with_different_params_are_grouped_separately(server):
+    client = graph.VectorAPIClient()
+
+    async def run():
+        return await asyncio.gather(
+            client.query_documents("alpha", max_retrieve_docs=5),
+            client.query_documents("beta", max_retrieve_docs=10),
+        )
+
+    asyncio.run(run())
+
+    assert sorted(
+        (body["query"], body["max_retrieve_docs"]) for _, body in server.requests
+    ) == [("alpha", 5), ("beta", 10)]
+    assert server.paths() == ["/query", "/query"]
+
+
+def test_cached_results_skip_the_request(server):
+    client = graph.VectorAPIClient()
+
+    first = query_all(client, ["Autism genes"])
+    second = query_all(client, ["genes autism"])
+
+    assert first == second
+    assert server.paths() == ["/query"]
+
+
+@pytest.mark.parametrize("status", [404, 422])
+def test_client_error_disables_batching(server, status):
+    server.batch_status = status
+    client = graph.VectorAPIClient()
+
+    results = query_all(client, ["alpha", "beta"])
+
+    assert results == [{"documents": ["alpha"]}, {"documents": ["beta"]}]
+    assert server.paths() == ["/query_batch", "/query", "/query"]
+    assert client._batch_supported is False
+
+    # Later concurrent queries go straight to /query
+    query_all(client, ["gamma", "delta"])
+    assert server.paths()[3:] == ["/query", "/query"]
+
+
+def test_server_error_falls_back_without_disabling_batching(server):
+    server.batch_status = 503
+    client = graph.VectorAPIClient()
+
+    results = query_all(client, ["alpha", "beta"])
+
+    assert results == [{"documents": ["alpha"]}, {"documents": ["beta"]}]
+    assert server.paths() == ["/query_batch", "/query", "/query"]
+    assert client._batch_supported is True
+
+
+def test_batch_timeout_fails_every_query_without_retrying(server):
+    server.batch_timeout = True
+    client = graph.VectorAPIClient()
+
+    results = query_all(client, ["alpha", "beta"], timeout=30)
+
+    assert results == [{"error": "Request timeout", "timeout": True}] * 2
+    assert server.paths() == ["/query_batch"]
+    assert client._batch_supported is True
+
+
+def test_errors_are_not_cached(server):
+    server.batch_timeout = True
+    client = graph.VectorAPIClient()
+    query_all(client, ["alpha", "beta"])
+
+    server.batch_timeout = False
+    results = query_all(client, ["alpha", "beta"])
+
+    assert results == [{"documents": ["alpha"]}, {"documents": ["beta"]}]
+
+
+def test_query_result_cache_normalizes_case_punctuation_and_order():
+    normalize = graph.QueryResultCache.normalize
+
+    assert normalize("Autism, genes!") == normalize("genes autism autism") == "autism genes"
+
+
+def test_query_result_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(graph.time, "monotonic", lambda: now[0])
+    cache = graph.QueryResultCache(ttl=10)
+    cache.put("key", {"documents": []})
+
+    now[0] += 5
+    assert cache.get("key") == {"documents": []}
+    now[0] += 10
+    assert cache.get("key") is None
+
+
+def test_query_result_cache_evicts_least_recently_used():
+    cache = graph.QueryResultCache(max_entries=2)
+    cache.put("a", {"id": "a"})
+    cache.put("b", {"id": "b"})
+    cache.get("a")
+    cache.put("c", {"id": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"id": "a"}
+    assert cache.get("c") == {"id": "c"}
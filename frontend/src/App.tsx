@@ -36,54 +36,28 @@ export default function App() {
           title: "Generating Search Queries",
           data: event.generate_query.query_list.join(", "),
         };
-      } else if (event.web_research) {
-        const sources = event.web_research.sources_gathered || [];
+      } else if (event.research) {
+        const sources = event.research.sources_gathered || [];
         const numSources = sources.length;
-        const searchQuery = event.web_research.search_query?.[0] || "unknown query";
-        processedEvent = {
-          title: "Web Research",
-          data: `Searching "${searchQuery}" - Found ${numSources} sources`,
-        };
-      } else if (event.knowledge_base_research) {
-        const sources = event.knowledge_base_research.sources_gathered || [];
-        const numSources = sources.length;
-        const searchQuery = event.knowledge_base_research.search_query?.[0] || "unknown query";
-        const searchStatus = event.knowledge_base_research.kb_search_status || "unknown";
-        const searchProgress = event.knowledge_base_research.kb_search_progress || "";
-        
-        // 根据搜索状态显示不同的信息
-        let statusIcon = "🔍";
-        let statusMessage = "";
-        
-        switch (searchStatus) {
-          case "initializing":
-            statusIcon = "🔄";
-            statusMessage = `Connecting to vector database for "${searchQuery}"`;
-            break;
+        const searchQuery = event.research.search_query?.[0] || "unknown query";
+        const kbStatus = event.research.kb_search_status || "unknown";
+        const kbProgress = event.research.kb_search_progress || "";
+
+        // 知识库超时或出错时，在研究条目中显示其状态
+        let kbNote = "";
+        switch (kbStatus) {
           case "timeout":
-            statusIcon = "⏱️";
-            statusMessage = `"${searchQuery}" - ${searchProgress}`;
+            kbNote = ` (⏱️ Knowledge base: ${kbProgress})`;
             break;
           case "error":
           case "failed":
-            statusIcon = "❌";
-            statusMessage = `"${searchQuery}" - ${searchProgress}`;
-            break;
-          case "completed":
-            statusIcon = numSources > 0 ? "✅" : "📭";
-            statusMessage = numSources > 0 
-              ? `Found ${numSources} documents for "${searchQuery}"`
-              : `"${searchQuery}" - ${searchProgress}`;
+            kbNote = ` (❌ Knowledge base: ${kbProgress})`;
             break;
-          default:
-            statusMessage = numSources > 0 
-              ? `Searching "${searchQuery}" - Found ${numSources} documents`
-              : `Searching "${searchQuery}" - ${searchProgress || "No relevant documents found"}`;
         }
-        
+
         processedEvent = {
-          title: "Knowledge Base Research",
-          data: `${statusIcon} ${statusMessage}`,
+          title: "Research",
+          data: `Searching "${searchQuery}" - Found ${numSources} sources${kbNote}`,
         };
       } else if (event.reflection) {
         processedEvent = {
@@ -1,7 +1,7 @@
 import type React from "react";
 import type { Message } from "@langchain/langgraph-sdk";
 import { ScrollArea } from "@/components/ui/scroll-area";
-import { Loader2, Copy, CopyCheck, ChevronDown, ChevronRight, Activity, Search, Brain, Pen, TextSearch, Database } from "lucide-react";
+import { Loader2, Copy, CopyCheck, ChevronDown, ChevronRight, Activity, Search, Brain, Pen, TextSearch } from "lucide-react";
 import { InputForm } from "@/components/InputForm";
 import { Button } from "@/components/ui/button";
 import { useState, ReactNode } from "react";
@@ -140,8 +140,6 @@ const SimpleTimeline: React.FC<{ events: ProcessedEvent[]; isLoading: boolean }>
       return <TextSearch className="h-4 w-4 text-neutral-400" />;
     } else if (title.toLowerCase().includes("reflection")) {
       return <Brain className="h-4 w-4 text-neutral-400" />;
-    } else if (title.toLowerCase().includes("knowledge base")) {
-      return <Database className="h-4 w-4 text-neutral-400" />;
     } else if (title.toLowerCase().includes("research")) {
       return <Search className="h-4 w-4 text-neutral-400" />;
     } else if (title.toLowerCase().includes("finalizing")) {